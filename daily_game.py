@@ -1,56 +1,72 @@
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
 import hashlib
+import logging
 import random
 import database
 from models import Category
 
+logger = logging.getLogger(__name__)
+
 class DailyGameGenerator:
     def __init__(self):
         self._current_categories = None
+        self._current_words = None
         self._current_date = None
 
     def get_today_date_key(self) -> str:
         return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
-    def get_daily_categories(self) -> List[Category]:
-        today_key = self.get_today_date_key()
+    def get_daily_categories(self, date_key: Optional[str] = None) -> List[Category]:
+        self._ensure_current_day(date_key)
+        return self._current_categories
+
+    def get_daily_words(self, date_key: Optional[str] = None) -> List[str]:
+        """Words of today's categories, shuffled once per day"""
+        self._ensure_current_day(date_key)
+        return self._current_words
+
+    def _ensure_current_day(self, date_key: Optional[str] = None):
+        today_key = date_key or self.get_today_date_key()
         
-        # Return cached categories if same day
+        # Keep cached game if same day
         if (self._current_categories and 
             self._current_date == today_key):
-            return self._current_categories
+            return
+        
+        # Generate new game for new day
+        seed = int.from_bytes(hashlib.blake2b(today_key.encode(), digest_size=8).digest(), "little")
+        rng = random.Random(seed)
         
-        # Generate new categories for new day
+        categories = self._generate_deterministic_categories(rng)
+        words = [word for category in categories for word in category.words]
+        rng.shuffle(words)
+        
+        self._current_words = words
+        self._current_categories = categories
         self._current_date = today_key
-        self._current_categories = self._generate_deterministic_categories(today_key)
-        return self._current_categories
 
-    def _generate_deterministic_categories(self, date_key: str) -> List[Category]:
-        seed = int(hashlib.md5(date_key.encode()).hexdigest()[:8], 16)
-        random.seed(seed)
-        
-        all_categories = database.get_categories()
-        
-        if len(all_categories) >= 4:
-            selected_categories = random.sample(all_categories, 4)
-            
-            categories = []
-            for cat_info in selected_categories:
-                words = database.get_words_by_category(cat_info["category_id"])
-                if len(words) >= 4:
-                    categories.append(Category(
-                        name=cat_info["category_name"], 
-                        words=words[:4]
-                    ))
-            
-            if len(categories) == 4:
-                return categories
+    def _generate_deterministic_categories(self, rng: random.Random) -> List[Category]:
+        # DB errors propagate: a cached fallback would pin a different board for the whole day
+        all_categories = database.get_all_category_words()
+        
+        # Only categories with enough words can be played
+        playable_categories = [
+            (name, words) for name, words in all_categories if len(words) >= 4
+        ]
+        
+        if len(playable_categories) >= 4:
+            selected_categories = rng.sample(playable_categories, 4)
+            return [
+                Category(name, tuple(words[:4]), frozenset(words[:4]))
+                for name, words in selected_categories
+            ]
         
+        logger.warning("Not enough categories in DB, using fallback")
         return self._get_fallback_categories()
 
     def _get_fallback_categories(self) -> List[Category]:
-        """Fallback categories in case of database issues"""
+        """Fallback categories when the DB has too few playable ones"""
         fallback_data = [
             ("Фрукты", ["Яблоко", "Банан", "Апельсин", "Виноград"]),
             ("Животные", ["Кошка", "Собака", "Лошадь", "Корова"]),
@@ -58,6 +74,6 @@ class DailyGameGenerator:
             ("Города", ["Москва", "Париж", "Лондон", "Токио"]),
         ]
         
-        return [Category(name=name, words=words) for name, words in fallback_data]
+        return [Category(name, tuple(words), frozenset(words)) for name, words in fallback_data]
 
 daily_generator = DailyGameGenerator()
\ No newline at end of file
@@ -1,14 +1,126 @@
 import sqlite3
 import os
-from typing import List, Dict, Any
+import pathlib
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "wordsdb.db")
+def _db_path_from_env() -> str:
+    # DATABASE_URL из .env, например sqlite:///./wordsdb.db; относительный путь - от папки модуля, а не от CWD
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    url = os.getenv("DATABASE_URL", "")
+    if url.startswith("sqlite:///"):
+        return os.path.normpath(os.path.join(base_dir, url[len("sqlite:///"):]))
+    return os.path.join(base_dir, "wordsdb.db")
 
+DB_PATH = _db_path_from_env()
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+if POOL_SIZE < 1:
+    raise ValueError(f"DB_POOL_SIZE must be at least 1, got {POOL_SIZE}")
+# Сколько ждать свободное соединение, прежде чем упасть, а не зависнуть
+POOL_TIMEOUT = 30
 
+# База только читается: открываем read-only, чтобы не менять файл и не создавать пустой
+_INIT_PRAGMAS = (
+    "PRAGMA cache_size=-20000",
+)
+
+
+class _ConnectionPool:
+    """Bounded pool of pre-configured SQLite connections"""
+
+    def __init__(self, path: str, size: int):
+        self._path = path
+        self._size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = pathlib.Path(self._path).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in _INIT_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self._size
+            if can_create:
+                self._created += 1
+
+        if not can_create:
+            # Pool exhausted - wait for a connection to be returned
+            try:
+                return self._idle.get(timeout=POOL_TIMEOUT)
+            except queue.Empty:
+                raise RuntimeError(f"No SQLite connection freed up within {POOL_TIMEOUT}s") from None
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        self._idle.put_nowait(conn)
+
+    def discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._created -= 1
+
+    def warm_up(self):
+        """Open every pool slot up front and touch each connection"""
+        conns = [self.acquire() for _ in range(self._size)]
+        for conn in conns:
+            conn.execute("SELECT 1")
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+
+_pool = _ConnectionPool(DB_PATH, POOL_SIZE)
+atexit.register(_pool.close_all)
+
+_CORPUS_CACHE = {"date": None, "data": None}
+_corpus_lock = threading.Lock()
+
+
+@contextmanager
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    conn = _pool.acquire()
+    try:
+        yield conn
+    except Exception:
+        _pool.discard(conn)
+        raise
+    else:
+        _pool.release(conn)
+
+def warm_pool():
+    _pool.warm_up()
+
+def close_pool():
+    _pool.close_all()
 
 def get_categories() -> List[Dict[str, Any]]:
     with get_connection() as conn:
@@ -22,4 +134,31 @@ def get_words_by_category(category_id: int) -> List[str]:
         cur = conn.cursor()
         cur.execute("SELECT word FROM words WHERE category_id = ?", (category_id,))
         rows = cur.fetchall()
-        return [row["word"] for row in rows]
\ No newline at end of file
+        return [row["word"] for row in rows]
+
+def get_all_category_words() -> List[Tuple[str, List[str]]]:
+    """All categories with their words, reloaded once per UTC day"""
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if _CORPUS_CACHE["date"] == today:
+        return _CORPUS_CACHE["data"]
+
+    with _corpus_lock:
+        if _CORPUS_CACHE["date"] == today:
+            return _CORPUS_CACHE["data"]
+
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT c.category_name, w.word FROM categories c "
+                "JOIN words w ON w.category_id = c.category_id "
+                "ORDER BY c.category_id, w.word_id"
+            )
+            rows = cur.fetchall()
+
+        words_by_category: Dict[str, List[str]] = {}
+        for row in rows:
+            words_by_category.setdefault(row["category_name"], []).append(row["word"])
+
+        _CORPUS_CACHE["data"] = list(words_by_category.items())
+        _CORPUS_CACHE["date"] = today
+        return _CORPUS_CACHE["data"]
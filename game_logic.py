@@ -1,5 +1,4 @@
 from typing import List, Dict, Tuple
-import random
 from models import Category
 from daily_game import daily_generator
 
@@ -9,11 +8,9 @@ class ConnectionsGame:
 
     def generate_game(self) -> Tuple[List[str], List[Category]]:
         categories = daily_generator.get_daily_categories()
-        all_words = [word for category in categories for word in category.words]
         
-        # Create a shuffled copy without affecting original
-        shuffled_words = all_words.copy()
-        random.shuffle(shuffled_words)
+        # Words are shuffled once per day; copy so callers can't affect the cache
+        shuffled_words = list(daily_generator.get_daily_words())
         
         return shuffled_words, categories
 
@@ -26,8 +23,9 @@ class ConnectionsGame:
             }
 
         # Check for exact match with any category
+        selected_set = frozenset(selected_words)
         for category in categories:
-            if set(selected_words) == set(category.words):
+            if selected_set == category.words_set:
                 return {
                     "valid": True, 
                     "category_name": category.name,
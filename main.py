@@ -1,220 +1,409 @@
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from starlette.requests import cookie_parser
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
-import traceback
-import json
+import asyncio
+import atexit
+import base64
+import hashlib
+import logging
+import logging.handlers
+import os
+import sys
+import orjson
+import queue
 import random
-import uuid
+import re
+import struct
+import threading
 import time
 import database
-from models import Category
+from daily_game import daily_generator
 
-app = FastAPI(title="Connections Game API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the DB pool, build today's game into app.state and keep it fresh"""
+    app.state.daily = None
+    await asyncio.to_thread(database.warm_pool)
+    try:
+        await get_daily_game(app.state, _today_iso(), "startup")
+    except Exception as e:
+        # Не валим воркер: игру соберет первый запрос или refresher
+        log_error("startup", "Failed to build daily game", e)
+    refresher = asyncio.create_task(_daily_refresher(app.state))
+    try:
+        yield
+    finally:
+        refresher.cancel()
+        database.close_pool()
+
+app = FastAPI(title="Connections Game API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 YAKT_TIMEZONE = timezone(timedelta(hours=9))
 
-def get_yakt_time():
-    """Получить текущее время в Якутске"""
-    return datetime.now(YAKT_TIMEZONE)
+_last_log_time = (None, None)
+
+def format_yakt_time(timestamp: float):
+    """Форматировать время для логов (по Якутску), одна строка на секунду"""
+    global _last_log_time
+    second = int(timestamp)
+    cached_second, cached_text = _last_log_time
+    if cached_second == second:
+        return cached_text
+    
+    text = datetime.fromtimestamp(second, YAKT_TIMEZONE).strftime("%Y-%m-%d %H:%M:%S %Z")
+    _last_log_time = (second, text)
+    return text
+
+class YaktFormatter(logging.Formatter):
+    def formatTime(self, record, datefmt=None):
+        return format_yakt_time(record.created)
+
+# Запросы только кладут запись в очередь, запись в stdout идет в отдельном потоке
+logger = logging.getLogger(__name__)
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler(sys.stdout)
+_log_handler.setFormatter(YaktFormatter("[%(asctime)s] %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+# daily_game пишет через ту же очередь и формат
+for _logger in (logger, logging.getLogger("daily_game")):
+    _logger.addHandler(_queue_handler)
+    _logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    _logger.propagate = False
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Засеваем один раз на процесс, дальше без os.urandom на каждый запрос
+_RNG = random.Random(os.urandom(16))
 
-def format_yakt_time():
-    """Форматировать время для логов"""
-    return get_yakt_time().strftime("%Y-%m-%d %H:%M:%S %Z")
+def new_user_hash():
+    return f"anon_{_RNG.getrandbits(32):08x}"
 
 def get_user_hash(request: Request):
     """Получить или создать user_hash для пользователя"""
-    user_hash = request.cookies.get("user_hash")
+    # LoggingMiddleware уже определил user_hash для этого запроса
+    user_hash = request.scope.get("state", {}).get("user_hash")
+    
+    if not user_hash:
+        user_hash = request.cookies.get("user_hash")
     
     if not user_hash:
         user_hash = request.headers.get("x-user-hash")
     
     if not user_hash:
-        user_hash = f"anon_{uuid.uuid4().hex[:8]}"
+        user_hash = new_user_hash()
     
     return user_hash
 
-def log_message(user_hash: str, message: str):
-    """Логировать сообщение с user_hash и временем"""
-    print(f"[{format_yakt_time()}] [USER:{user_hash}] {message}")
+def log_message(user_hash: str, message: str, *args, level: int = logging.DEBUG):
+    """Логировать сообщение с user_hash (%-аргументы форматируются только если запись пишется)"""
+    if logger.isEnabledFor(level):
+        logger.log(level, "[USER:%s] " + message, user_hash, *args)
 
 def log_error(user_hash: str, message: str, error: Exception = None):
-    """Логировать ошибку с user_hash и временем"""
-    error_msg = f"❌ {message}"
-    if error:
-        error_msg += f": {str(error)}"
-    print(f"[{format_yakt_time()}] [USER:{user_hash}] {error_msg}")
+    """Логировать ошибку с user_hash (и traceback, если есть исключение)"""
     if error:
-        traceback.print_exc()
+        logger.error("[USER:%s] ❌ %s: %s", user_hash, message, error, exc_info=error)
+    else:
+        logger.error("[USER:%s] ❌ %s", user_hash, message)
 
-@app.middleware("http")
-async def logging_middleware(request: Request, call_next):
-    user_hash = get_user_hash(request)
-    start_time = time.time()
+# Атрибуты cookie user_hash (1 год), собраны один раз
+# x-user-hash попадает в Set-Cookie как есть, поэтому пускаем только безопасные символы
+_USER_HASH_RE = re.compile(rb"[A-Za-z0-9_-]{1,64}")
+_USER_HASH_COOKIE_ATTRS = b"; Max-Age=31536000; Path=/; HttpOnly; Secure; SameSite=None; Domain=.twc1.net"
+
+class LoggingMiddleware:
+    """Лог запросов и cookie user_hash - чистый ASGI, без BaseHTTPMiddleware"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Пробы балансировщика на /health - без лога, user_hash и Set-Cookie
+        if scope["type"] != "http" or scope["path"] == "/health":
+            await self.app(scope, receive, send)
+            return
+        
+        cookie_user_hash = None
+        header_user_hash = None
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                # Полный разбор Cookie только если там действительно есть user_hash
+                if b"user_hash=" in value:
+                    cookie_user_hash = cookie_parser(value.decode("latin-1")).get("user_hash")
+            elif name == b"x-user-hash" and _USER_HASH_RE.fullmatch(value):
+                header_user_hash = value.decode("latin-1")
+        
+        user_hash = cookie_user_hash or header_user_hash or new_user_hash()
+        scope.setdefault("state", {})["user_hash"] = user_hash
+        
+        method, path = scope["method"], scope["path"]
+        start_time = time.perf_counter()
+        
+        log_message(user_hash, "→ %s %s", method, path)
+        response_started = False
+        
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                process_time = time.perf_counter() - start_time
+                log_message(user_hash, "← %s %s - %s (%.3fs)", method, path, message["status"], process_time, level=logging.INFO)
+                
+                if not cookie_user_hash:
+                    message.setdefault("headers", []).append(
+                        (b"set-cookie", b"user_hash=" + user_hash.encode("latin-1") + _USER_HASH_COOKIE_ATTRS)
+                    )
+            
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            # Отвечаем 500 здесь, внутри CORS, чтобы фронт получил читаемую ошибку и cookie
+            log_error(user_hash, f"Error in {path}", exc)
+            if response_started:
+                raise
+            body = orjson.dumps({"error": f"Internal server error: {str(exc)}"})
+            await send_wrapper({
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())
+                ]
+            })
+            await send_wrapper({"type": "http.response.body", "body": body})
+
+app.add_middleware(LoggingMiddleware)
+
+# Origin в браузере приходит без завершающего слэша
+_CORS_ORIGINS = frozenset((
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+    "https://tylmus.ru",
+    "https://www.tylmus.ru",
+    "https://tylmus-tylmus-frontend-8a70.twc1.net",
+))
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=_CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "X-User-Hash"],
+)
+
+class ProfilerMiddleware:
+    """?profile=1 - вместо ответа отдать HTML-отчет pyinstrument по запросу"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or b"profile=" not in scope["query_string"]:
+            await self.app(scope, receive, send)
+            return
+        
+        from pyinstrument import Profiler
+        
+        async def discard_send(message):
+            pass
+        
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard_send)
+        finally:
+            profiler.stop()
+        
+        body = profiler.output_html().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/html; charset=utf-8"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# Только для отладки: pip install pyinstrument и ENABLE_PROFILER=1
+if os.getenv("ENABLE_PROFILER"):
+    app.add_middleware(ProfilerMiddleware)
+
+CATEGORY_COLORS = ["yellow", "green", "blue", "purple"]
+
+_TODAY = {"bucket": None, "date": None}
+
+def _today_iso():
+    """Текущая дата UTC (ISO), пересчитывается не чаще раза в секунду"""
+    # Секунды по тем же часам, что и у refresher'а: граница суток совпадает с границей секунды
+    bucket = int(time.time())
+    if _TODAY["bucket"] != bucket:
+        _TODAY["date"] = datetime.now(timezone.utc).date().isoformat()
+        _TODAY["bucket"] = bucket
+    return _TODAY["date"]
+
+_daily_lock = threading.Lock()
+_daily_build_lock = asyncio.Lock()
+
+def _build_daily_game(today_str: str, user_hash: str):
+    """Build the daily game - same for everyone today"""
+    selected_categories = daily_generator.get_daily_categories(today_str)
+    all_words = daily_generator.get_daily_words(today_str)
     
-    log_message(user_hash, f"→ {request.method} {request.url.path}")
+    categories_payload = []
+    word_color_map = {}
+    match_index = {}
+    for i, category in enumerate(selected_categories):
+        color = CATEGORY_COLORS[i] if i < len(CATEGORY_COLORS) else "gray"
+        categories_payload.append({
+            "name": category.name,
+            "words": category.words,
+            "color": color
+        })
+        for word in category.words:
+            word_color_map[word] = color
+        match_index[category.words_set] = (i, category)
+    categories_payload = tuple(categories_payload)
     
-    response = await call_next(request)
+    # Списки найденных категорий для каждой маски прогресса - общие для всех запросов
+    found_by_mask = tuple(
+        tuple(category for i, category in enumerate(categories_payload) if mask & (1 << i))
+        for mask in range(1 << len(categories_payload))
+    )
+    found_json_by_mask = tuple(orjson.dumps(found) for found in found_by_mask)
     
-    process_time = time.time() - start_time
-    log_message(user_hash, f"← {request.method} {request.url.path} - {response.status_code} ({process_time:.3f}s)")
+    # Тело /api/game без закрывающей скобки - прогресс пользователя дописывается в конец
+    game_json_prefix = orjson.dumps({
+        "words": all_words,
+        "categories": categories_payload,
+        "game_date": today_str,
+        "word_colors": word_color_map
+    })[:-1]
     
-    if not request.cookies.get("user_hash"):
-        response.set_cookie(
-            key="user_hash",
-            value=user_hash,
-            max_age=365*24*60*60,  # 1 год
-            httponly=True,
-            samesite="none",
-            secure=True,
-            domain=".twc1.net" 
-        )
+    game_etag = hashlib.blake2b(game_json_prefix, digest_size=8).hexdigest()
     
-    return response
+    log_message(user_hash, "🎮 New daily game created for date: %s", today_str, level=logging.INFO)
+    
+    return {
+        "categories": selected_categories,
+        "words": all_words,
+        "game_date": today_str,
+        "categories_payload": categories_payload,
+        "found_by_mask": found_by_mask,
+        "found_json_by_mask": found_json_by_mask,
+        "word_colors": word_color_map,
+        "match_index": match_index,
+        "game_json_prefix": game_json_prefix,
+        "game_etag": game_etag
+    }
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000", 
-        "http://127.0.0.1:3000",
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        "https://tylmus.ru",
-        "https://www.tylmus.ru",
-        "https://tylmus-tylmus-frontend-8a70.twc1.net/"
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def _load_daily_game(state, today_str: str, user_hash: str):
+    with _daily_lock:
+        game = state.daily
+        if game is None or game["game_date"] < today_str:
+            game = state.daily = _build_daily_game(today_str, user_hash)
+        return game
 
-def get_categories_from_db(user_hash: str):
-    """Get categories from your actual database"""
-    try:
-        db_categories = database.get_categories()
-        categories = []
-        
-        for cat in db_categories:
-            words = database.get_words_by_category(cat["category_id"])
-            if len(words) >= 4:
-                categories.append(
-                    Category(name=cat["category_name"], words=words[:4])
-                )
-        
-        log_message(user_hash, f"📊 Loaded {len(categories)} categories from database")
-        return categories
-        
-    except Exception as e:
-        log_error(user_hash, "Error loading categories from DB", e)
-        return generate_fallback_categories(user_hash)
-
-def generate_fallback_categories(user_hash: str):
-    """Fallback categories if database fails"""
-    log_message(user_hash, "🔄 Using fallback categories")
-    return [
-        Category("Фрукты", ["Яблоко", "Апельсин", "Банан", "Виноград"]),
-        Category("Транспорт", ["Машина", "Автобус", "Поезд", "Велосипед"]),
-        Category("Цвета", ["Красный", "Синий", "Зеленый", "Желтый"]),
-        Category("Животные", ["Собака", "Кошка", "Птица", "Рыба"])
-    ]
-
-def create_daily_game(user_hash: str):
-    """Create a daily game - same for everyone today"""
-    try:
-        all_categories = get_categories_from_db(user_hash)
-        
-        if len(all_categories) < 4:
-            log_message(user_hash, "⚠️ Not enough categories from DB, using fallback")
-            all_categories = generate_fallback_categories(user_hash)
-        
+async def get_daily_game(state, today_str: str, user_hash: str):
+    """Today's game from app.state, building it at most once per UTC day
+    
+    A cached game newer than today_str is kept: a request with a slightly stale date
+    must not roll the board back right after the midnight refresh.
+    """
+    game = state.daily
+    if game is not None and game["game_date"] >= today_str:
+        return game
+    
+    # Одновременные запросы в начале дня ждут одну сборку, а не занимают потоки executor'а
+    async with _daily_build_lock:
+        game = state.daily
+        if game is not None and game["game_date"] >= today_str:
+            return game
+        
+        # Сборка игры ходит в SQLite - не блокируем event loop
+        return await asyncio.to_thread(_load_daily_game, state, today_str, user_hash)
+
+def _seconds_until_utc_midnight():
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+    return (midnight - now).total_seconds()
+
+async def _daily_refresher(state):
+    """Пересобрать игру сразу после полуночи UTC, чтобы запросы ее не ждали"""
+    while True:
+        await asyncio.sleep(_seconds_until_utc_midnight())
         today_str = datetime.now(timezone.utc).date().isoformat()
-        random.seed(today_str)
-        
-        selected_categories = random.sample(all_categories, 4)
-        
-        all_words = []
-        for category in selected_categories:
-            all_words.extend(category.words)
-        
-        random.shuffle(all_words)
-        
-        game_state = {
-            "categories": selected_categories,
-            "words": all_words,
-            "game_date": today_str
-        }
-        
-        log_message(user_hash, f"🎮 New daily game created for date: {today_str}")
-        #log_message(user_hash, f"📝 {len(all_words)} words and {len(selected_categories)} categories")
-        #for category in selected_categories:
-        #    log_message(user_hash, f"      {category.name}: {category.words}")
-        
-        return game_state
-        
-    except Exception as e:
-        log_error(user_hash, "Error creating daily game", e)
-        raise
+        try:
+            await get_daily_game(state, today_str, "refresher")
+            logger.info("🗓️ Daily game refreshed for %s", today_str)
+        except Exception as e:
+            log_error("refresher", "Failed to refresh daily game", e)
+            # Не крутимся в цикле, если база недоступна; запросы соберут игру сами
+            await asyncio.sleep(60)
+
+# user_progress: base64url от 5 байт - found_mask, mistakes, YY, MM, DD
+_PROGRESS_STRUCT = struct.Struct("<BBBBB")
+
+def _encode_progress(found_mask, game_date, mistakes):
+    year, month, day = map(int, game_date.split("-"))
+    raw = _PROGRESS_STRUCT.pack(found_mask, min(mistakes, 255), year - 2000, month, day)
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def _decode_progress(value):
+    raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    if len(raw) != _PROGRESS_STRUCT.size:
+        raise ValueError(f"unexpected progress cookie length {len(raw)}")
+    found_mask, mistakes, year, month, day = _PROGRESS_STRUCT.unpack(raw)
+    return {
+        "found_mask": found_mask,
+        "game_date": f"{2000 + year:04d}-{month:02d}-{day:02d}",
+        "mistakes": mistakes
+    }
 
 def get_user_progress(request: Request, user_hash: str):
-    """Get user's progress from cookie"""
-    try:
-        progress_cookie = request.cookies.get("user_progress")
-        if progress_cookie:
-            progress_data = json.loads(progress_cookie)
-            
-            category_colors = ["yellow", "green", "blue", "purple"]
-            found_categories = progress_data.get("found_categories", [])
-            
-            for i, cat in enumerate(found_categories):
-                if isinstance(cat, dict) and "color" not in cat:
-                    cat["color"] = category_colors[i] if i < len(category_colors) else "gray"
-                elif isinstance(cat, str):
-                    found_categories[i] = {
-                        "name": cat,
-                        "words": [],
-                        "color": category_colors[i] if i < len(category_colors) else "gray"
-                    }
-            
-            if "mistakes" not in progress_data:
-                progress_data["mistakes"] = 0
-            
-            log_message(user_hash, f"📖 Loaded user progress: {len(found_categories)} categories, {progress_data['mistakes']} mistakes")
-            return progress_data
-        
-        log_message(user_hash, "📖 No user progress found")
-        return {"found_categories": [], "game_date": None, "mistakes": 0}
+    """Get user's progress from the binary cookie
+    
+    Bit i of found_mask means category i of that day's game is found.
+    """
+    progress_cookie = request.cookies.get("user_progress")
+    if progress_cookie:
+        try:
+            progress_data = _decode_progress(progress_cookie)
+        except ValueError as e:
+            log_error(user_hash, "Error parsing user progress cookie", e)
+            return {"found_mask": 0, "game_date": None, "mistakes": 0}
+        
+        log_message(user_hash, "📖 Loaded user progress: mask %x, %d mistakes", progress_data["found_mask"], progress_data["mistakes"])
+        return progress_data
     
-    except (json.JSONDecodeError, KeyError) as e:
-        log_error(user_hash, "Error parsing user progress cookie", e)
-        return {"found_categories": [], "game_date": None, "mistakes": 0}
+    log_message(user_hash, "📖 No user progress found")
+    return {"found_mask": 0, "game_date": None, "mistakes": 0}
 
-def set_user_progress(response: Response, found_categories, game_date, mistakes=0, user_hash: str = "unknown"):
+def set_user_progress(response: Response, found_mask, game_date, mistakes=0, user_hash: str = "unknown"):
     """Set user's progress in cookie"""
-    try:
-        # Добавляем цвета к найденным категориям
-        category_colors = ["yellow", "green", "blue", "purple"]
-        for i, cat in enumerate(found_categories):
-            if "color" not in cat:
-                cat["color"] = category_colors[i] if i < len(category_colors) else "gray"
-        
-        progress_data = {
-            "found_categories": found_categories,
-            "game_date": game_date,
-            "mistakes": mistakes
-        }
-        
-        response.set_cookie(
-            key="user_progress",
-            value=json.dumps(progress_data),
-            max_age=86400 * 2,
-            httponly=True,
-            samesite="none",
-            secure=True,
-            domain=".twc1.net"
-        )
-        log_message(user_hash, f"💾 Saved user progress: {len(found_categories)} categories, {mistakes} mistakes")
-    except Exception as e:
-        log_error(user_hash, "Error setting user progress cookie", e)
+    response.set_cookie(
+        key="user_progress",
+        value=_encode_progress(found_mask, game_date, mistakes),
+        max_age=86400 * 2,
+        httponly=True,
+        samesite="none",
+        secure=True,
+        domain=".twc1.net"
+    )
+    log_message(user_hash, "💾 Saved user progress: mask %x, %d mistakes", found_mask, mistakes)
+
+def get_found_categories(daily_game, found_mask):
+    """Found categories (name, words, color) of today's game by bitmask"""
+    found_by_mask = daily_game["found_by_mask"]
+    return found_by_mask[found_mask & (len(found_by_mask) - 1)]
 
 def is_same_day(date1, date2):
     """Check if two dates are the same day"""
@@ -226,239 +415,194 @@ async def root(request: Request):
     log_message(user_hash, "Root endpoint accessed")
     return {"message": "Connections Game API is running", "docs": "/docs"}
 
+_HEALTH_RESPONSE = {"status": "ok"}
+
+@app.get("/health")
+async def health_check():
+    return _HEALTH_RESPONSE
+
 @app.get("/api/game")
 async def get_game(request: Request):
     user_hash = get_user_hash(request)
     
-    try:
-        daily_game = create_daily_game(user_hash)
-        
-        user_progress = get_user_progress(request, user_hash)
-        
-        today = datetime.now(timezone.utc).date().isoformat()
-        user_has_todays_progress = is_same_day(user_progress.get("game_date"), today)
-        
-        found_categories = user_progress["found_categories"] if user_has_todays_progress else []
-        mistakes = user_progress["mistakes"] if user_has_todays_progress else 0
-        
-        category_colors = ["yellow", "green", "blue", "purple"]
-        categories_with_colors = []
-        
-        for i, cat in enumerate(daily_game["categories"]):
-            color = category_colors[i] if i < len(category_colors) else "gray"
-            categories_with_colors.append({
-                "name": cat.name,
-                "words": cat.words,
-                "color": color
-            })
-        
-        word_color_map = {}
-        for i, cat in enumerate(daily_game["categories"]):
-            color = category_colors[i] if i < len(category_colors) else "gray"
-            for word in cat.words:
-                word_color_map[word] = color
-        
-        response_data = {
-            "words": daily_game["words"],
-            "categories": categories_with_colors,
-            "game_date": daily_game["game_date"],
-            "found_categories": found_categories,
-            "mistakes": mistakes,
-            "remaining": len(daily_game["categories"]) - len(found_categories),
-            "word_colors": word_color_map
-        }
-        
-        log_message(user_hash, f"📤 Returning game data: {len(response_data['words'])} words, {len(found_categories)} found categories, {mistakes} mistakes")
-        
-        response = JSONResponse(response_data)
-        if user_has_todays_progress:
-            set_user_progress(response, found_categories, today, mistakes, user_hash)
-        
-        return response
-        
-    except Exception as e:
-        log_error(user_hash, "Error in /api/game", e)
-        return JSONResponse(
-            {"error": f"Internal server error: {str(e)}"}, 
-            status_code=500
-        )
-        
+    today = _today_iso()
+    daily_game = await get_daily_game(request.app.state, today, user_hash)
+    
+    user_progress = get_user_progress(request, user_hash)
+    
+    user_has_todays_progress = is_same_day(user_progress["game_date"], today)
+    
+    found_mask = user_progress["found_mask"] if user_has_todays_progress else 0
+    mistakes = user_progress["mistakes"] if user_has_todays_progress else 0
+    
+    # ETag = игра дня + прогресс пользователя, тело ответа однозначно им определяется
+    etag = f'"{daily_game["game_etag"]}-{found_mask:x}-{mistakes}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        log_message(user_hash, "📤 Game data not modified")
+        return Response(status_code=304, headers=cache_headers)
+    
+    found_index = found_mask & (len(daily_game["found_by_mask"]) - 1)
+    found_categories = daily_game["found_by_mask"][found_index]
+    remaining = len(daily_game["categories"]) - len(found_categories)
+    
+    # Тело ответа склеивается из заранее сериализованных кусков, JSON на запрос не строится
+    body = b"".join((
+        daily_game["game_json_prefix"],
+        b',"found_categories":',
+        daily_game["found_json_by_mask"][found_index],
+        b',"mistakes":%d,"remaining":%d}' % (mistakes, remaining)
+    ))
+    
+    log_message(user_hash, "📤 Returning game data: %d words, %d found categories, %d mistakes", len(daily_game["words"]), len(found_categories), mistakes)
+    
+    response = Response(content=body, media_type="application/json", headers=cache_headers)
+    if user_has_todays_progress:
+        set_user_progress(response, found_mask, today, mistakes, user_hash)
+    
+    return response
+
 @app.post("/api/check_selection")
 async def check_selection(selected_words: list[str], request: Request):
     user_hash = get_user_hash(request)
     
-    try:
-        log_message(user_hash, f"Checking selection: {selected_words}")
-        
-        daily_game = create_daily_game(user_hash)
-        
-        user_progress = get_user_progress(request, user_hash)
-        today = datetime.now(timezone.utc).date().isoformat()
-        
-        if not is_same_day(user_progress.get("game_date"), today):
-            log_message(user_hash, "🆕 New day detected, resetting progress")
-            user_progress = {"found_categories": [], "game_date": today, "mistakes": 0}
-        
-        found_categories = user_progress["found_categories"]
-        mistakes = user_progress.get("mistakes", 0)
-        
-        # Цвета категорий
-        category_colors = ["yellow", "green", "blue", "purple"]
-        
-        # Создаем мапу: слово → цвет
-        word_color_map = {}
-        for i, cat in enumerate(daily_game["categories"]):
-            color = category_colors[i] if i < len(category_colors) else "gray"
-            for word in cat.words:
-                word_color_map[word] = color
-        
-        for i, category in enumerate(daily_game["categories"]):
-            if set(selected_words) == set(category.words):
-                log_message(user_hash, f"✅ Match found: {category.name}")
-                
-                category_already_found = any(
-                    found_cat["name"] == category.name 
-                    for found_cat in found_categories
-                )
-                
-                if not category_already_found:
-                    found_categories.append({
-                        "name": category.name,
-                        "words": selected_words,
-                        "color": category_colors[i] if i < len(category_colors) else "gray"
-                    })
-                    log_message(user_hash, f"➕ Added to found categories: {category.name}")
-                else:
-                    log_message(user_hash, f"ℹ️ Category already found: {category.name}")
-
-                remaining = len(daily_game["categories"]) - len(found_categories)
-                game_complete = remaining == 0
-                
-                log_message(user_hash, f"📊 Progress: {len(found_categories)}/{len(daily_game['categories'])} categories found, {mistakes} mistakes")
-                
-                response_data = {
-                    "valid": True,
-                    "category_name": category.name,
-                    "category_color": category_colors[i] if i < len(category_colors) else "gray",
-                    "remaining": remaining,
-                    "game_complete": game_complete
-                }
-                
-                response = JSONResponse(response_data)
-                set_user_progress(response, found_categories, today, mistakes, user_hash)
-                
-                return response
+    log_message(user_hash, "Checking selection: %s", selected_words)
+    
+    today = _today_iso()
+    daily_game = await get_daily_game(request.app.state, today, user_hash)
+    
+    user_progress = get_user_progress(request, user_hash)
+    
+    if not is_same_day(user_progress["game_date"], today):
+        log_message(user_hash, "🆕 New day detected, resetting progress")
+        user_progress = {"found_mask": 0, "game_date": today, "mistakes": 0}
+    
+    found_mask = user_progress["found_mask"]
+    mistakes = user_progress["mistakes"]
+    
+    word_color_map = daily_game["word_colors"]
+    
+    hit = daily_game["match_index"].get(frozenset(selected_words))
+    if hit is not None:
+        i, category = hit
+        found_mask |= 1 << i
+        found_categories = get_found_categories(daily_game, found_mask)
 
-        log_message(user_hash, "❌ No category match found - adding mistake")
-        mistakes += 1
-        
-        # Определяем цвета выбранных слов
-        selected_colors = []
-        for word in selected_words:
-            if word in word_color_map:
-                selected_colors.append(word_color_map[word])
+        remaining = len(daily_game["categories"]) - len(found_categories)
+        game_complete = remaining == 0
         
         response_data = {
-            "valid": False,
-            "message": "Эти слова не образуют категорию",
-            "mistakes": mistakes,
-            "selected_colors": selected_colors  # Новая: цвета выбранных слов
+            "valid": True,
+            "category_name": category.name,
+            "category_color": CATEGORY_COLORS[i] if i < len(CATEGORY_COLORS) else "gray",
+            "remaining": remaining,
+            "game_complete": game_complete
         }
         
-        response = JSONResponse(response_data)
-        set_user_progress(response, found_categories, today, mistakes, user_hash)
+        response = ORJSONResponse(response_data)
+        set_user_progress(response, found_mask, today, mistakes, user_hash)
         
         return response
-        
-    except Exception as e:
-        log_error(user_hash, "Error in /api/check_selection", e)
-        return JSONResponse(
-            {"error": f"Internal server error: {str(e)}"}, 
-            status_code=500
-        )
+
+    log_message(user_hash, "❌ No category match found - adding mistake")
+    mistakes += 1
+    
+    # Определяем цвета выбранных слов
+    selected_colors = []
+    for word in selected_words:
+        if word in word_color_map:
+            selected_colors.append(word_color_map[word])
+    
+    response_data = {
+        "valid": False,
+        "message": "Эти слова не образуют категорию",
+        "mistakes": mistakes,
+        "selected_colors": selected_colors  # Новая: цвета выбранных слов
+    }
+    
+    response = ORJSONResponse(response_data)
+    set_user_progress(response, found_mask, today, mistakes, user_hash)
+    
+    return response
 
 @app.get("/api/game_status")
 async def get_game_status(request: Request):
     user_hash = get_user_hash(request)
     
-    try:
-        daily_game = create_daily_game(user_hash)
-        
-        user_progress = get_user_progress(request, user_hash)
-        today = datetime.now(timezone.utc).date().isoformat()
-        
-        if not is_same_day(user_progress.get("game_date"), today):
-            user_progress = {"found_categories": [], "game_date": today, "mistakes": 0}
-        
-        found_categories = user_progress["found_categories"]
-        mistakes = user_progress.get("mistakes", 0)
-        remaining = len(daily_game["categories"]) - len(found_categories)
-        
-        response_data = {
-            "found_categories": found_categories,
-            "total_categories": len(daily_game["categories"]),
-            "remaining": remaining,
-            "game_date": daily_game["game_date"],
-            "mistakes": mistakes, 
-            "game_complete": remaining == 0
-        }
-        
-        response = JSONResponse(response_data)
-        set_user_progress(response, found_categories, today, mistakes, user_hash)
-        return response
-        
-    except Exception as e:
-        log_error(user_hash, "Error in /api/game_status", e)
-        return JSONResponse({"error": str(e)})
+    today = _today_iso()
+    daily_game = await get_daily_game(request.app.state, today, user_hash)
+    
+    user_progress = get_user_progress(request, user_hash)
+    
+    if not is_same_day(user_progress["game_date"], today):
+        user_progress = {"found_mask": 0, "game_date": today, "mistakes": 0}
+    
+    found_mask = user_progress["found_mask"]
+    found_categories = get_found_categories(daily_game, found_mask)
+    mistakes = user_progress["mistakes"]
+    remaining = len(daily_game["categories"]) - len(found_categories)
+    
+    response_data = {
+        "found_categories": found_categories,
+        "total_categories": len(daily_game["categories"]),
+        "remaining": remaining,
+        "game_date": daily_game["game_date"],
+        "mistakes": mistakes, 
+        "game_complete": remaining == 0
+    }
+    
+    response = ORJSONResponse(response_data)
+    set_user_progress(response, found_mask, today, mistakes, user_hash)
+    return response
 
 @app.get("/api/daily_info")
 async def get_daily_info(request: Request):
     user_hash = get_user_hash(request)
     
-    try:
-        daily_game = create_daily_game(user_hash)
-        
-        user_progress = get_user_progress(request, user_hash)
-        today = datetime.now(timezone.utc).date().isoformat()
-        
-        if not is_same_day(user_progress.get("game_date"), today):
-            user_progress = {"found_categories": [], "game_date": today, "mistakes": 0}
-        
-        found_categories = user_progress["found_categories"]
-        mistakes = user_progress.get("mistakes", 0)
-        remaining = len(daily_game["categories"]) - len(found_categories)
-        
-        response_data = {
-            "today": today,
-            "current_game_date": daily_game["game_date"],
-            "game_complete": remaining == 0,
-            "found_count": len(found_categories),
-            "total_categories": len(daily_game["categories"]),
-            "mistakes": mistakes
-        }
-        
-        response = JSONResponse(response_data)
-        set_user_progress(response, found_categories, today, mistakes, user_hash)
-        return response
-        
-    except Exception as e:
-        log_error(user_hash, "Error in /api/daily_info", e)
-        return JSONResponse({"error": str(e)})
+    today = _today_iso()
+    daily_game = await get_daily_game(request.app.state, today, user_hash)
+    
+    user_progress = get_user_progress(request, user_hash)
+    
+    if not is_same_day(user_progress["game_date"], today):
+        user_progress = {"found_mask": 0, "game_date": today, "mistakes": 0}
+    
+    found_mask = user_progress["found_mask"]
+    found_categories = get_found_categories(daily_game, found_mask)
+    mistakes = user_progress["mistakes"]
+    remaining = len(daily_game["categories"]) - len(found_categories)
+    
+    response_data = {
+        "today": today,
+        "current_game_date": daily_game["game_date"],
+        "game_complete": remaining == 0,
+        "found_count": len(found_categories),
+        "total_categories": len(daily_game["categories"]),
+        "mistakes": mistakes
+    }
+    
+    response = ORJSONResponse(response_data)
+    set_user_progress(response, found_mask, today, mistakes, user_hash)
+    return response
 
 @app.post("/api/reset_progress")
 async def reset_progress(request: Request, response: Response):
     """Reset user's progress for current day"""
     user_hash = get_user_hash(request)
-    today = datetime.now(timezone.utc).date().isoformat()
-    set_user_progress(response, [], today, 0, user_hash)
+    today = _today_iso()
+    set_user_progress(response, 0, today, 0, user_hash)
     log_message(user_hash, "🔄 User progress reset")
     return {"message": "Progress reset successfully"}
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
-        app, 
-        host="0.0.0.0", 
-        port=8000,
+        "main:app", 
+        host=os.getenv("HOST", "0.0.0.0"), 
+        port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count())),
         log_config=None 
     )
\ No newline at end of file
@@ -1,7 +1,4 @@
-from dataclasses import dataclass
-from typing import List
+from collections import namedtuple
 
-@dataclass
-class Category:
-    name: str
-    words: List[str]
\ No newline at end of file
+# name: str, words: Tuple[str, ...], words_set: FrozenSet[str] - множество слов для сравнения с выбором игрока
+Category = namedtuple("Category", "name words words_set")
\ No newline at end of file